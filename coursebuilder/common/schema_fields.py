@@ -76,7 +76,15 @@ class Property(object):
 
 
 class Registry(object):
-    """Registry is a collection of Property's."""
+    """Registry is a collection of Property's.
+
+    Serialized forms of the registry are cached once computed.  Mutators
+    of a registry must call _invalidate_cached_schemas(), which also clears
+    the caches of all containing registries.  A registry knows only one
+    container: the registry it was last added to, either as a sub-registry
+    or as the item type of a FieldArray.  Registries shared by several
+    containers must not be changed once those have been serialized.
+    """
 
     SCHEMA_PATH_SEPARATOR = '/'
 
@@ -90,6 +98,9 @@ class Registry(object):
         self._extra_schema_dict_values = extra_schema_dict_values or {}
         self._properties = []
         self._sub_registries = collections.OrderedDict()
+        self._parent = None
+        self._json_schema_cached = None
+        self._schema_dict_cached = None
 
     @property
     def name(self):
@@ -107,9 +118,22 @@ class Registry(object):
     def properties(self):
         return self._properties
 
+    def _invalidate_cached_schemas(self):
+        """Drop cached serializations of this registry and its parents."""
+        registry = self
+        while registry:
+            # pylint: disable=protected-access
+            registry._json_schema_cached = None
+            registry._schema_dict_cached = None
+            registry = registry._parent
+
     def add_property(self, schema_field):
         """Add a Property to this Registry."""
+        item_type = getattr(schema_field, 'item_type', None)
+        if isinstance(item_type, Registry):
+            item_type._parent = self  # pylint: disable=protected-access
         self._properties.append(schema_field)
+        self._invalidate_cached_schemas()
 
     def get_property(self, property_name):
         for prop in self._properties:
@@ -123,6 +147,7 @@ class Registry(object):
     def remove_property(self, property_name):
         prop = self.get_property(property_name)
         if prop:
+            self._invalidate_cached_schemas()
             return self._properties.pop(self._properties.index(prop))
 
     def add_sub_registry(self, name, title=None, description=None,
@@ -134,7 +159,9 @@ class Registry(object):
             registry = self.__class__(title=title, description=description,
                 extra_schema_dict_values=extra_schema_dict_values)
         registry._name = name  # pylint: disable=protected-access
+        registry._parent = self  # pylint: disable=protected-access
         self._sub_registries[name] = registry
+        self._invalidate_cached_schemas()
         return registry
 
     def has_subregistries(self):
@@ -184,9 +211,11 @@ class Registry(object):
             for part in parts:
                 node = node[part]
 
-        registry = copy.deepcopy(self)
+        # Copy only this registry, not the registries containing it.
+        registry = copy.deepcopy(self, {id(self._parent): None})
         def delete_all_but(registry, node):
             # pylint: disable=protected-access
+            registry._invalidate_cached_schemas()
             # Copy so deleting does not wreck iterator.
             for prop in copy.copy(registry._properties):
                 if prop.name not in node:
@@ -395,7 +424,9 @@ class FieldRegistry(Registry):
 
     def get_json_schema(self):
         """Get the json schema for this API."""
-        return json.dumps(self.get_json_schema_dict())
+        if self._json_schema_cached is None:
+            self._json_schema_cached = json.dumps(self.get_json_schema_dict())
+        return self._json_schema_cached
 
     def _get_schema_dict(self, prefix_key):
         """Get schema dict for this API."""
@@ -419,7 +450,9 @@ class FieldRegistry(Registry):
 
     def get_schema_dict(self):
         """Get schema dict for this API."""
-        return self._get_schema_dict(list())
+        if self._schema_dict_cached is None:
+            self._schema_dict_cached = self._get_schema_dict(list())
+        return list(self._schema_dict_cached)
 
     @classmethod
     def _add_entry(cls, key_part_list, value, entity):
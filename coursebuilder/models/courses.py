@@ -128,6 +128,29 @@ def deep_dict_merge(*args):
     _deep_merge(result, default_values_dict)
     return result
 
+def shallow_overlay(overlay, base):
+    """Merges overlay onto base like deep_dict_merge, without deep copies.
+
+    Only the dictionaries along paths present in both overlay and base are
+    copied; all other values in the result are shared by reference with the
+    arguments, which are not modified.  Callers must not mutate the result
+    unless they own both arguments.
+
+    Args:
+      overlay: dict. Values taking precedence, e.g., settings from a request.
+      base: dict. Values used where overlay has none.
+    Returns:
+      A new dict holding the merged values.
+    """
+    result = dict(base)
+    for key, value in overlay.iteritems():
+        base_value = result.get(key)
+        if (base_value and isinstance(value, dict) and
+            isinstance(base_value, dict)):
+            value = shallow_overlay(value, base_value)
+        result[key] = value
+    return result
+
 # The template dict for all courses
 yaml_path = os.path.join(appengine_config.BUNDLE_ROOT, 'course_template.yaml')
 with open(yaml_path) as course_template_yaml:
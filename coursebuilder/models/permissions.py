@@ -18,7 +18,6 @@ __author__ = 'Mike Gainer (mgainer@google.com)'
 
 import collections
 import copy
-import itertools
 
 from common import schema_fields
 import roles
@@ -245,13 +244,32 @@ class SchemaPermissionRegistry(object):
         return [p for p in scope_permissions.itervalues()
                 if p.applies_to_current_user(app_context)]
 
+    @classmethod
+    def get_signature(cls, app_context, scope):
+        """Get a hashable summary of the current user's permissions.
+
+        Users with equal signatures have the same set of active permissions,
+        and so see identically redacted schemas.  This makes the signature
+        suitable for use in keys of caches holding redacted schemas.
+
+        Args:
+          app_context: Standard Course Builder Application Context object.
+          scope: A string indicating which schema scope we are checking.
+              (e.g., 'course' for course settings, 'unit' for unit schema,
+               'assessment' for assesments, and so on.)
+        Returns:
+          A frozenset of the names of the active permissions.
+        """
+        perms = cls._get_active_permissions(app_context, scope)
+        return frozenset(p.get_name() for p in perms)
+
     @classmethod
     def redact_schema_to_permitted_fields(cls, app_context, scope, schema):
         """Delete and/or mark as read-only fields not permitted to user."""
 
         perms = cls._get_active_permissions(app_context, scope)
-        user_can_view = lambda name: any([p.can_view(name) for p in perms])
-        user_can_edit = lambda name: any([p.can_edit(name) for p in perms])
+        user_can_view = lambda name: any(p.can_view(name) for p in perms)
+        user_can_edit = lambda name: any(p.can_edit(name) for p in perms)
 
         def build_prop_path(prefix, suffix):
             if not prefix:
@@ -264,6 +282,7 @@ class SchemaPermissionRegistry(object):
         # object.
         def visit_schema(schema, prefix, in_editable_container=True):
             # pylint: disable=protected-access
+            schema._invalidate_cached_schemas()
             for prop in copy.copy(schema._properties):
                 name = build_prop_path(prefix, prop.name)
                 if not user_can_view(name):
@@ -282,9 +301,14 @@ class SchemaPermissionRegistry(object):
     @classmethod
     def _build_checker(cls, scope, sections, can_operate):
         def check_callback(app_context):
-            perms = cls._get_active_permissions(app_context, scope)
-            return any([can_operate(p, s)
-                        for p, s in itertools.product(perms, sections)])
+            # Match sections before asking whether a permission applies to
+            # the current user, since the latter may need a roles lookup, and
+            # stop at the first permission granting access.
+            for p in cls._validate_scope(scope).itervalues():
+                if (any(can_operate(p, s) for s in sections) and
+                    p.applies_to_current_user(app_context)):
+                    return True
+            return False
         return check_callback
 
     @classmethod
@@ -353,7 +377,7 @@ def can_view(app_context, scope):
     """
     # pylint: disable=protected-access
     perms = SchemaPermissionRegistry._get_active_permissions(app_context, scope)
-    return any([p.can_view() for p in perms])
+    return any(p.can_view() for p in perms)
 
 
 def can_edit(app_context, scope):
@@ -375,7 +399,7 @@ def can_edit(app_context, scope):
     """
     # pylint: disable=protected-access
     perms = SchemaPermissionRegistry._get_active_permissions(app_context, scope)
-    return any([p.can_edit() for p in perms])
+    return any(p.can_edit() for p in perms)
 
 
 def can_view_property(app_context, scope, property_name):
@@ -23,8 +23,10 @@ import re
 import urlparse
 
 from common import utils as common_utils
+from common import caching
 from common import crypto
 from common import resource
+from common import schema_fields
 from controllers import sites
 from controllers import utils
 from models import config
@@ -36,6 +38,7 @@ from models import transforms
 from modules.courses import availability
 from modules.courses import constants
 from modules.courses import lessons
+from modules.courses import settings
 from modules.courses import triggers
 from modules.courses import triggers_tests
 from modules.courses import unit_lesson_editor
@@ -2766,6 +2769,181 @@ class CourseSettingsRESTHandlerTests(actions.TestBase):
         self.assertEquals(
             {'el', 'fr'}, self._get_locale_label_titles())
 
+    def test_get_revalidates_with_etag(self):
+        self.swap(courses.Course, 'COURSE_ENV_POST_COPY_HOOKS', [])
+        actions.login(self._ADMIN_EMAIL)
+        self.course.save()
+        uri = self._URI + '?key=/course.yaml'
+        response = self.get(uri)
+        self.assertEquals(200, response.status_int)
+        etag = response.headers['ETag']
+
+        response = self.get(uri, headers={'If-None-Match': etag})
+        self.assertEquals(304, response.status_int)
+        self.assertEquals(etag, response.headers['ETag'])
+        self.assertEquals('', response.body)
+
+        # Other request parameters get other tags.
+        response = self.get(self._URI + '?key=course.yaml')
+        self.assertNotEquals(etag, response.headers['ETag'])
+
+        # Saving settings retires the tag.
+        self._put_extra_locales('en_US', ['el'])
+        response = self.get(uri, headers={'If-None-Match': etag})
+        self.assertEquals(200, response.status_int)
+        self.assertNotEquals(etag, response.headers['ETag'])
+
+    def test_etag_changes_with_schema_providers(self):
+        self.swap(courses.Course, 'COURSE_ENV_POST_COPY_HOOKS', [])
+        actions.login(self._ADMIN_EMAIL)
+        self.course.save()
+        uri = self._URI + '?key=/course.yaml'
+        etag = self.get(uri).headers['ETag']
+
+        def etag_test_provider(unused_course):
+            return schema_fields.SchemaField(
+                'unit:etag_test', 'ETag Test', 'string', optional=True)
+
+        providers = collections.defaultdict(
+            list, courses.Course.OPTIONS_SCHEMA_PROVIDERS)
+        providers['unit'] = providers['unit'] + [etag_test_provider]
+        self.swap(courses.Course, 'OPTIONS_SCHEMA_PROVIDERS', providers)
+        response = self.get(uri, headers={'If-None-Match': etag})
+        self.assertEquals(200, response.status_int)
+        self.assertNotEquals(etag, response.headers['ETag'])
+
+    def test_no_etag_with_post_copy_hooks(self):
+        self.swap(courses.Course, 'COURSE_ENV_POST_COPY_HOOKS',
+                  [lambda unused_app_context, unused_env: None])
+        actions.login(self._ADMIN_EMAIL)
+        self.course.save()
+        response = self.get(self._URI + '?key=/course.yaml')
+        self.assertEquals(200, response.status_int)
+        self.assertNotIn('ETag', response.headers)
+
+
+class CourseSettingsCachingTests(actions.TestBase):
+    _ADMIN_EMAIL = 'admin@foo.com'
+    _COURSE_NAME = 'settings_caching'
+
+    _NAMESPACE = 'ns_%s' % _COURSE_NAME
+    _VIEWER_EMAIL = 'viewer@foo.com'
+
+    def setUp(self):
+        super(CourseSettingsCachingTests, self).setUp()
+        self.base = '/' + self._COURSE_NAME
+        app_context = actions.simple_add_course(
+            self._COURSE_NAME, self._ADMIN_EMAIL, 'Settings Caching')
+        courses.Course(None, app_context).save()
+        with common_utils.Namespace(self._NAMESPACE):
+            models.RoleDAO.save(models.RoleDTO(the_id=None, the_dict={
+                'name': 'Settings Viewer',
+                'permissions': {
+                    constants.MODULE_NAME: [
+                        constants.VIEW_ALL_SETTINGS_PERMISSION]},
+                'description': 'Can view all course settings.',
+                'users': [self._VIEWER_EMAIL]}))
+
+        self.schema_builds = 0
+        create_settings_schema = courses.Course.create_settings_schema
+
+        def counting_create_settings_schema(course):
+            self.schema_builds += 1
+            return create_settings_schema(course)
+
+        self.swap(courses.Course, 'create_settings_schema',
+                  counting_create_settings_schema)
+        self.swap(settings, '_SECTION_SCHEMA_CACHE',
+                  caching.LRUCache(max_item_count=64))
+        self.swap(settings, '_REST_SCHEMA_CACHE',
+                  caching.LRUCache(max_item_count=64))
+
+    def tearDown(self):
+        sites.reset_courses()
+        super(CourseSettingsCachingTests, self).tearDown()
+
+    def test_advanced_settings_show_updated_course_yaml(self):
+        actions.update_course_config_as_admin(
+            self._COURSE_NAME, self._ADMIN_EMAIL,
+            {'course': {'blurb': 'Blurb before edit'}})
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        response = self.get('dashboard?action=settings_advanced')
+        self.assertIn('Blurb before edit', response.body)
+
+        actions.update_course_config_as_admin(
+            self._COURSE_NAME, self._ADMIN_EMAIL,
+            {'course': {'blurb': 'Blurb after edit'}})
+        response = self.get('dashboard?action=settings_advanced')
+        self.assertIn('Blurb after edit', response.body)
+        self.assertNotIn('Blurb before edit', response.body)
+
+    def _render_unit_settings(self):
+        response = self.get('dashboard?action=settings_unit')
+        self.assertEquals(200, response.status_int)
+
+    def test_section_schema_reused_on_repeat_render(self):
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        self._render_unit_settings()
+        self.assertEquals(1, self.schema_builds)
+        self._render_unit_settings()
+        self.assertEquals(1, self.schema_builds)
+
+    def test_section_schema_rebuilt_after_settings_saved(self):
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        self._render_unit_settings()
+        actions.update_course_config_as_admin(
+            self._COURSE_NAME, self._ADMIN_EMAIL,
+            {'course': {'blurb': 'Changed'}})
+        self._render_unit_settings()
+        self.assertEquals(2, self.schema_builds)
+
+    def test_section_schema_cached_per_permission_signature(self):
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        self._render_unit_settings()
+        actions.login(self._VIEWER_EMAIL)
+        self._render_unit_settings()
+        self.assertEquals(2, self.schema_builds)
+        self.assertEquals(2, len(settings._SECTION_SCHEMA_CACHE.items))
+
+        # Each user is now served from their own entry.
+        self._render_unit_settings()
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        self._render_unit_settings()
+        self.assertEquals(2, self.schema_builds)
+
+    def _get_settings_payload(self):
+        response = transforms.loads(self.get(
+            'rest/course/settings?key=/course.yaml').body)
+        self.assertEquals(200, response['status'])
+        return transforms.loads(response['payload'])
+
+    def test_rest_schema_reused_on_repeat_get(self):
+        actions.update_course_config_as_admin(
+            self._COURSE_NAME, self._ADMIN_EMAIL,
+            {'course': {'blurb': 'Blurb before edit'}})
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        payload = self._get_settings_payload()
+        self.assertEquals('Blurb before edit', payload['course']['blurb'])
+        self.assertEquals(1, self.schema_builds)
+        self.assertEquals(payload, self._get_settings_payload())
+        self.assertEquals(1, self.schema_builds)
+
+        # Saved values are never served from the cached schema.
+        actions.update_course_config_as_admin(
+            self._COURSE_NAME, self._ADMIN_EMAIL,
+            {'course': {'blurb': 'Blurb after edit'}})
+        payload = self._get_settings_payload()
+        self.assertEquals('Blurb after edit', payload['course']['blurb'])
+        self.assertEquals(2, self.schema_builds)
+
+    def test_rest_schema_cached_per_permission_signature(self):
+        actions.login(self._ADMIN_EMAIL, is_admin=True)
+        self._get_settings_payload()
+        actions.login(self._VIEWER_EMAIL)
+        self._get_settings_payload()
+        self.assertEquals(2, self.schema_builds)
+        self.assertEquals(2, len(settings._REST_SCHEMA_CACHE.items))
+
 
 class EventRecordingRestHandlerTests(actions.TestBase):
 
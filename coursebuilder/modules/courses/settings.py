@@ -17,15 +17,18 @@
 __author__ = 'Abhinav Khandelwal (abhinavk@google.com)'
 
 import cgi
-import copy
+import hashlib
 import logging
 import os
+import time
 import urllib
 
+from common import caching
 from common import crypto
 from common import menus
 from common import safe_dom
 from common import schema_fields
+from common import users
 from controllers import utils as controllers_utils
 from models import courses
 from models import models
@@ -44,6 +47,28 @@ SETTINGS_TAB_NAME = 'settings'
 # Reference to custom_module registered in modules/courses/courses.py
 custom_module = None
 
+# Location of the template for course.yaml shipped with the application.
+_COURSE_TEMPLATE_PATH = os.path.join(
+    os.path.dirname(__file__), '../../course_template.yaml')
+
+# Contents of files shown on the advanced settings page, keyed by file
+# identity.  Values are (modification time, safe_dom list, text) tuples, so
+# files are only re-read and re-decoded when they have changed.
+_FILE_CACHE = caching.LRUCache(max_item_count=64)
+
+# Redacted settings editor schemas for dashboard settings tabs.  Keys hold
+# everything the schema depends on; see _get_section_schema().  Values are
+# (JSON schema, schema dict, display types) tuples.
+_SECTION_SCHEMA_CACHE = caching.LRUCache(max_item_count=64)
+
+# Redacted full settings schemas used by CourseSettingsRESTHandler, keyed
+# like _SECTION_SCHEMA_CACHE.  Schemas are only read once built, so one
+# instance may serve many requests.
+_REST_SCHEMA_CACHE = caching.LRUCache(max_item_count=64)
+
+# Incremented each time course settings are saved, retiring cached schemas.
+_settings_generation = 0
+
 
 class CourseSettingsHandler(object):
     """Course settings handler."""
@@ -76,8 +101,22 @@ class CourseSettingsHandler(object):
         handler.redirect('/dashboard')
 
     @staticmethod
-    def _show_edit_settings_section(
-            handler, template_values, key, section_names, exit_url=''):
+    def _get_section_schema(handler, section_names):
+        """Get JSON schema, schema dict and display types for sections.
+
+        Building and redacting the schema is expensive, so results are
+        cached.  The cache key covers the course settings and content
+        files, the registered schema providers, the sections shown and the
+        permissions of the current user.  Read-only courses, and courses
+        whose files carry no update time, are not cached.
+        """
+        app_context = handler.app_context
+        cache_key = _get_schema_cache_key(handler, tuple(section_names))
+        if cache_key:
+            found, value = _SECTION_SCHEMA_CACHE.get(cache_key)
+            if found:
+                return value
+
         # The editor for all course settings is getting rather large.  Here,
         # prune out all sections except the one named.  Names can name either
         # entire sub-registries, or a single item.  E.g., "course" selects all
@@ -86,16 +125,27 @@ class CourseSettingsHandler(object):
         schema = handler.get_course().create_settings_schema()
         schema = schema.clone_only_items_named(section_names)
         permissions.SchemaPermissionRegistry.redact_schema_to_permitted_fields(
-            handler.app_context, constants.SCOPE_COURSE_SETTINGS, schema)
+            app_context, constants.SCOPE_COURSE_SETTINGS, schema)
+        value = (schema.get_json_schema(), schema.get_schema_dict(),
+                 list(schema.get_display_types()))
+        if cache_key:
+            _SECTION_SCHEMA_CACHE.put(cache_key, value)
+        return value
+
+    @staticmethod
+    def _show_edit_settings_section(
+            handler, template_values, key, section_names, exit_url=''):
+        json_schema, schema_dict, display_types = (
+            CourseSettingsHandler._get_section_schema(handler, section_names))
 
         rest_url = handler.canonicalize_url(CourseSettingsRESTHandler.URI)
         form_html = oeditor.ObjectEditor.get_html_for(
-            handler, schema.get_json_schema(), schema.get_schema_dict(),
+            handler, json_schema, schema_dict,
             key, rest_url, exit_url,
             additional_dirs=CourseSettingsHandler.ADDITIONAL_DIRS,
             extra_css_files=CourseSettingsHandler.EXTRA_CSS_FILES,
             extra_js_files=CourseSettingsHandler.EXTRA_JS_FILES,
-            display_types=schema.get_display_types())
+            display_types=display_types)
         template_values.update({
             'main_content': form_html,
         })
@@ -151,9 +201,15 @@ class CourseSettingsHandler(object):
         if placement is None:
             placement = menus.MenuItem.DEFAULT_PLACEMENT
 
-        if name in cls.GROUP_SETTINGS_LISTS:
-            cls.GROUP_SETTINGS_LISTS[name].extend(settings)
-            tab = dashboard.DashboardHandler.root_menu_group.get_child(
+        groups = cls.GROUP_SETTINGS_LISTS
+        dashboard_handler = dashboard.DashboardHandler
+        if name in groups:
+            # Extend in place; the permission checker for this section holds
+            # a reference to the list.  Skip repeats of known settings.
+            group_settings = groups[name]
+            group_settings.extend(
+                [s for s in settings if s not in group_settings])
+            tab = dashboard_handler.root_menu_group.get_child(
                 SETTINGS_TAB_NAME).get_child(sub_group_name).get_child(name)
             if tab.title != title:
                 logging.warning(
@@ -167,18 +223,18 @@ class CourseSettingsHandler(object):
                         placement, title,
                         tab.placement)
         else:
-            cls.GROUP_SETTINGS_LISTS[name] = copy.copy(settings)
-            dashboard.DashboardHandler.add_sub_nav_mapping(
+            group_settings = list(settings)
+            groups[name] = group_settings
+            dashboard_handler.add_sub_nav_mapping(
                 SETTINGS_TAB_NAME, name, title,
                 action=action_name,
                 contents=(lambda h: CourseSettingsHandler._show_settings_tab(
-                    h, cls.GROUP_SETTINGS_LISTS[name])),
+                    h, groups[name])),
                 placement=placement, sub_group_name=sub_group_name)
-            dashboard.DashboardHandler.map_get_action_to_permission_checker(
+            dashboard_handler.map_get_action_to_permission_checker(
                 action_name,
                 permissions.SchemaPermissionRegistry.build_view_checker(
-                    constants.SCOPE_COURSE_SETTINGS,
-                    cls.GROUP_SETTINGS_LISTS[name]))
+                    constants.SCOPE_COURSE_SETTINGS, group_settings))
 
             if schema_provider:
                 courses.Course.OPTIONS_SCHEMA_PROVIDER_TITLES[name] = title
@@ -189,9 +245,49 @@ class CourseSettingsHandler(object):
 class CourseYamlRESTHandler(controllers_utils.BaseRESTHandler):
     """Common base for REST handlers in this file."""
 
+    # Settings schema built by process_put(), if any, for put() to reuse.
+    _settings_schema = None
+
     def get_course_dict(self):
         return self.get_course().get_environ(self.app_context)
 
+    def _get_etag(self, stream):
+        """Get an ETag for the GET response, or None if it can't be known.
+
+        The tag covers everything the response depends on: the deployed
+        application version and registered schema providers, the course
+        settings and content files, the course version, the request
+        parameters, and the current user, their permissions and locale.
+        The response carries an XSRF token, so the tag also changes every
+        half token lifetime, keeping tokens in cached responses valid.
+
+        Hooks in Course.COURSE_ENV_POST_COPY_HOOKS may alter the settings on
+        each request from inputs the tag can't cover (e.g., student group
+        overrides), so no tag is given while any are registered.
+        """
+        if courses.Course.COURSE_ENV_POST_COPY_HOOKS:
+            return None
+        app_context = self.app_context
+        metadata = getattr(stream, 'metadata', None)
+        data_updated_on = _get_file_updated_on(
+            app_context, app_context.fs.impl.physical_to_logical(
+                courses.PersistentCourse13.COURSES_FILENAME))
+        if not metadata or not data_updated_on:
+            return None
+        user = users.get_current_user()
+        return '"%s"' % hashlib.md5('|'.join(str(item) for item in (
+            os.environ.get('CURRENT_VERSION_ID'),
+            _get_schema_providers_signature(),
+            metadata.updated_on, data_updated_on, self.get_course().version,
+            sorted(permissions.SchemaPermissionRegistry.get_signature(
+                app_context, constants.SCOPE_COURSE_SETTINGS)),
+            user.user_id() if user else None,
+            app_context.get_current_locale(),
+            self.request.query_string,
+            int(time.time()) // (
+                crypto.XsrfTokenManager.XSRF_TOKEN_AGE_SECS // 2),
+            ))).hexdigest()
+
     def get(self):
         """Handles REST GET verb and returns an object as JSON payload."""
         assert self.app_context.is_editable_fs()
@@ -216,6 +312,15 @@ class CourseYamlRESTHandler(controllers_utils.BaseRESTHandler):
                 self, 404, 'Object not found.', {'key': key})
             return
 
+        # Let clients reuse their copy if nothing has changed.
+        etag = self._get_etag(stream)
+        if etag:
+            self.response.headers['ETag'] = etag
+            if_none_match = self.request.headers.get('If-None-Match', '')
+            if etag in [tag.strip() for tag in if_none_match.split(',')]:
+                self.response.set_status(304)
+                return
+
         # Prepare data.
         json_payload = self.process_get()
         transforms.send_json_response(
@@ -272,13 +377,16 @@ class CourseYamlRESTHandler(controllers_utils.BaseRESTHandler):
 
         request_data = self.process_put(request, payload)
 
-        schema = self.get_course().create_settings_schema()
+        schema = (self._settings_schema or
+                  self.get_course().create_settings_schema())
         permissions.SchemaPermissionRegistry.redact_schema_to_permitted_fields(
             self.app_context, constants.SCOPE_COURSE_SETTINGS, schema)
         schema.redact_entity_to_schema(payload)
 
         if request_data:
-            course_settings = courses.deep_dict_merge(
+            # Both dicts are private to this request, so the merge may share
+            # their branches rather than copying them.
+            course_settings = courses.shallow_overlay(
                 request_data, self.get_course_dict())
             self.postprocess_put(course_settings, request)
 
@@ -320,11 +428,23 @@ class CourseSettingsRESTHandler(CourseYamlRESTHandler):
 
     XSRF_ACTION = 'basic-course-settings-put'
 
-    def process_get(self):
-        entity = {}
+    def _get_redacted_schema(self):
+        """Get the settings schema redacted for the current user, cached."""
+        cache_key = _get_schema_cache_key(self)
+        if cache_key:
+            found, schema = _REST_SCHEMA_CACHE.get(cache_key)
+            if found:
+                return schema
         schema = self.get_course().create_settings_schema()
         permissions.SchemaPermissionRegistry.redact_schema_to_permitted_fields(
             self.app_context, constants.SCOPE_COURSE_SETTINGS, schema)
+        if cache_key:
+            _REST_SCHEMA_CACHE.put(cache_key, schema)
+        return schema
+
+    def process_get(self):
+        entity = {}
+        schema = self._get_redacted_schema()
         schema.convert_entity_to_json_entity(
             self.get_course_dict(), entity)
 
@@ -334,15 +454,29 @@ class CourseSettingsRESTHandler(CourseYamlRESTHandler):
             data['_reserved:namespace'] = \
                 self.app_context.get_namespace_name()
 
+        # Without top-level fields, every top-level value is a sub-registry
+        # dict, which dict_to_json() would pass through unchanged.
+        if not schema.properties:
+            return entity
         json_payload = transforms.dict_to_json(entity)
 
         return json_payload
 
+    @staticmethod
+    def _get_locale_labels():
+        """Get all locale labels, preferring the copy held in memcache.
+
+        LabelDAO drops its memcached list of all labels whenever a label is
+        saved or deleted, so this avoids a datastore query on the common
+        path where settings are saved without changing locales.
+        """
+        return [label for label in models.LabelDAO.get_all_mapped().values()
+                if label.type == models.LabelDTO.LABEL_TYPE_LOCALE]
+
     def _process_extra_locales(self, default_locale, extra_locales):
         """Make sure each locale has a label to go along."""
 
-        existing_locale_labels = models.LabelDAO.get_all_of_type(
-            models.LabelDTO.LABEL_TYPE_LOCALE)
+        existing_locale_labels = self._get_locale_labels()
 
         existing = {label.title for label in existing_locale_labels}
         required = {l['locale']  for l in extra_locales} | {default_locale}
@@ -369,6 +503,7 @@ class CourseSettingsRESTHandler(CourseYamlRESTHandler):
         schema = self.get_course().create_settings_schema()
         schema.convert_json_to_entity(payload, request_data)
         schema.validate(request_data, errors)
+        self._settings_schema = schema
 
         if errors:
             transforms.send_json_response(
@@ -497,37 +632,107 @@ class HtmlHookRESTHandler(CourseYamlRESTHandler):
         return course_dict
 
     def _process_delete_internal(self, course_dict, key):
+        parts = key.split(controllers_utils.HtmlHooks.SEPARATOR)
         pruned_dict = course_dict
-        for element in key.split(controllers_utils.HtmlHooks.SEPARATOR):
-            if element in pruned_dict:
-                if type(pruned_dict[element]) == dict:
-                    pruned_dict = pruned_dict[element]
-                else:
-                    del pruned_dict[element]
+        for element in parts[:-1]:
+            pruned_dict = pruned_dict.get(element)
+            if not isinstance(pruned_dict, dict):
+                return course_dict
+        if not isinstance(pruned_dict.get(parts[-1]), dict):
+            pruned_dict.pop(parts[-1], None)
         return course_dict
 
 
-def _text_file_to_safe_dom(reader, content_if_empty):
-    """Load text file and convert it to safe_dom tree for display."""
-    info = []
-    if reader:
-        lines = reader.read().decode('utf-8')
-        for line in lines.split('\n'):
-            if not line:
-                continue
-            pre = safe_dom.Element('pre')
-            pre.add_text(line)
-            info.append(pre)
-    else:
-        info.append(content_if_empty)
-    return info
-
-def _text_file_to_string(reader, content_if_empty):
-    """Load text file and convert it to string for display."""
-    if reader:
-        return reader.read().decode('utf-8')
-    else:
+def _text_lines_to_safe_dom(text, content_if_empty):
+    """Convert text file content to safe_dom tree for display."""
+    if text is None:
+        return [content_if_empty]
+    element = safe_dom.Element
+    return [element('pre').add_text(line)
+            for line in text.splitlines() if line]
+
+def _text_to_string(text, content_if_empty):
+    """Convert text file content to string for display."""
+    if text is None:
         return content_if_empty
+    return text
+
+def _get_schema_providers_signature():
+    """Describe registered settings schema providers, alike in all processes.
+
+    Providers are named by module and name rather than by identity, so the
+    description can go into values shared with clients, such as ETags.
+    """
+    return sorted(
+        (name, ['%s.%s' % (getattr(provider, '__module__', None),
+                           getattr(provider, '__name__', None))
+                for provider in providers])
+        for name, providers in
+        courses.Course.OPTIONS_SCHEMA_PROVIDERS.iteritems())
+
+def _get_schema_cache_key(handler, *extra):
+    """Get a key for caching settings schemas built for a handler.
+
+    The key covers the course settings and content files, the registered
+    schema providers and the permissions of the current user, followed by
+    any extra items given.  Returns None for read-only courses and courses
+    whose files carry no update time; their schemas are not cached.
+    """
+    app_context = handler.app_context
+    if not app_context.is_editable_fs():
+        return None
+    config_updated_on = _get_file_updated_on(
+        app_context, app_context.get_config_filename())
+    data_updated_on = _get_file_updated_on(
+        app_context, app_context.fs.impl.physical_to_logical(
+            courses.PersistentCourse13.COURSES_FILENAME))
+    if not config_updated_on or not data_updated_on:
+        return None
+    return (
+        app_context.get_namespace_name(), config_updated_on, data_updated_on,
+        handler.get_course().version, _settings_generation,
+        permissions.SchemaPermissionRegistry.get_signature(
+            app_context, constants.SCOPE_COURSE_SETTINGS),
+        tuple(sorted(
+            (name, tuple(providers)) for name, providers in
+            courses.Course.OPTIONS_SCHEMA_PROVIDERS.iteritems()))) + extra
+
+
+def _get_file_updated_on(app_context, filename):
+    """Get last update time of a file in the course VFS, if known."""
+    metadata = getattr(app_context.fs.open(filename), 'metadata', None)
+    return metadata.updated_on if metadata else None
+
+def _load_cached(key, modified_on, open_reader):
+    """Load file content for display, re-reading only when it has changed.
+
+    Args:
+      key: A hashable value identifying the file.
+      modified_on: Modification time of the file.  If None, the file content
+        is not cached.
+      open_reader: A function returning a reader for the file, or None if
+        the file does not exist.  Only called when the file is re-read.
+    Returns:
+      A (safe_dom_info, text) tuple.
+    """
+    found, entry = _FILE_CACHE.get(key)
+    if not found or modified_on is None or entry[0] != modified_on:
+        reader = open_reader()
+        text = reader.read().decode('utf-8') if reader else None
+        entry = (
+            modified_on,
+            _text_lines_to_safe_dom(text, '< empty file >'),
+            _text_to_string(text, '< empty file >'))
+        if modified_on is not None:
+            _FILE_CACHE.delete(key)
+            _FILE_CACHE.put(key, entry)
+    return list(entry[1]), entry[2]
+
+def _load_course_template():
+    """Load course_template.yaml for display; it only changes on deploy."""
+    return _load_cached(
+        _COURSE_TEMPLATE_PATH, os.path.getmtime(_COURSE_TEMPLATE_PATH),
+        lambda: open(_COURSE_TEMPLATE_PATH, 'r'))
 
 def _get_settings_advanced(handler):
     """Renders course settings view."""
@@ -546,21 +751,18 @@ def _get_settings_advanced(handler):
             'xsrf_token': crypto.XsrfTokenManager.create_xsrf_token(
                 'create_or_edit_settings')})
 
-    # course.yaml file content.
-    yaml_reader = app_context.fs.open(app_context.get_config_filename())
-    yaml_info = _text_file_to_safe_dom(yaml_reader, '< empty file >')
-    yaml_reader = app_context.fs.open(app_context.get_config_filename())
-    yaml_lines = _text_file_to_string(yaml_reader, '< empty file >')
+    # course.yaml file content.  Files in the datastore-backed VFS carry
+    # their last update time; files without metadata are not cached.
+    config_filename = app_context.get_config_filename()
+    yaml_reader = app_context.fs.open(config_filename)
+    metadata = getattr(yaml_reader, 'metadata', None)
+    yaml_info, yaml_lines = _load_cached(
+        (app_context.get_namespace_name(), config_filename),
+        metadata.updated_on if metadata else None,
+        lambda: yaml_reader)
 
     # course_template.yaml file contents
-    course_template_reader = open(os.path.join(os.path.dirname(
-        __file__), '../../course_template.yaml'), 'r')
-    course_template_info = _text_file_to_safe_dom(
-        course_template_reader, '< empty file >')
-    course_template_reader = open(os.path.join(os.path.dirname(
-        __file__), '../../course_template.yaml'), 'r')
-    course_template_lines = _text_file_to_string(
-        course_template_reader, '< empty file >')
+    course_template_info, course_template_lines = _load_course_template()
 
     template_values['sections'] = [
         {
@@ -616,6 +818,11 @@ def get_namespaced_handlers():
     ]
 
 
+def _on_course_settings_saved(unused_course_settings):
+    global _settings_generation  # pylint: disable=global-statement
+    _settings_generation += 1
+
+
 def on_module_enabled(courses_custom_module, perms):
     global custom_module  # pylint: disable=global-statement
     custom_module = courses_custom_module
@@ -628,6 +835,12 @@ def on_module_enabled(courses_custom_module, perms):
         constants.SCOPE_COURSE_SETTINGS,
         ViewAllSettingsPermission())
 
+    courses.Course.COURSE_ENV_POST_SAVE_HOOKS.append(_on_course_settings_saved)
+
+    # Read the shipped template at startup so that the first render of the
+    # advanced settings page is served from the cache.
+    _load_course_template()
+
     dashboard.DashboardHandler.add_custom_post_action(
         'course_availability', CourseSettingsHandler.post_course_availability)
     dashboard.DashboardHandler.map_post_action_to_permission_checker(
@@ -460,6 +460,29 @@ class HtmlHookTest(actions.TestBase):
         self.assertNotIn('bar', env['foo'])
         self.assertNotIn('bar', env['html_hooks']['foo'])
 
+    def _delete_hook(self, key):
+        url = '%s?key=%s&xsrf_token=%s' % (
+            ADMIN_SETTINGS_URL, cgi.escape(key), cgi.escape(self.xsrf_token))
+        self.delete(url)
+        return self.course.get_environ(self.app_context)
+
+    def test_hook_rest_delete_with_missing_parent_keeps_unrelated_items(self):
+        actions.update_course_config(COURSE_NAME, {'bar': 'zab'})
+        env = self._delete_hook('foo.bar')
+        self.assertEquals('zab', env['bar'])
+
+    def test_hook_rest_delete_with_non_dict_parent_keeps_parent(self):
+        actions.update_course_config(COURSE_NAME, {'foo': 'zab'})
+        env = self._delete_hook('foo.bar')
+        self.assertEquals('zab', env['foo'])
+
+    def test_hook_rest_delete_keeps_dict_leaf(self):
+        actions.update_course_config(
+            COURSE_NAME, {'html_hooks': {'foo': {'bar': {'baz': 'zab'}}}})
+        env = self._delete_hook('foo.bar')
+        self.assertEquals(
+            {'baz': 'zab'}, env['html_hooks']['foo']['bar'])
+
 
 class JinjaContextTest(actions.TestBase):
 
@@ -183,6 +183,23 @@ class PermissionsTests(actions.TestBase):
             actions.login(self.NON_ROLE_EMAIL)
             self.assertFalse(checker(self.app_context))
 
+    def test_signature(self):
+        reg = permissions.SchemaPermissionRegistry
+        with common_utils.Namespace(self.NAMESPACE):
+            actions.login(self.ADMIN_EMAIL)
+            self.assertEquals(
+                frozenset([permissions.CourseAdminSchemaPermission.NAME,
+                           self.PERMISSION_NAME]),
+                reg.get_signature(self.app_context, self.PERMISSION_SCOPE))
+            actions.login(self.IN_ROLE_EMAIL)
+            self.assertEquals(
+                frozenset([self.PERMISSION_NAME]),
+                reg.get_signature(self.app_context, self.PERMISSION_SCOPE))
+            actions.login(self.NON_ROLE_EMAIL)
+            self.assertEquals(
+                frozenset(),
+                reg.get_signature(self.app_context, self.PERMISSION_SCOPE))
+
     def test_schema_redaction(self):
         reg = permissions.SchemaPermissionRegistry
         with common_utils.Namespace(self.NAMESPACE):
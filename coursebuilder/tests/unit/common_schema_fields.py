@@ -369,6 +369,31 @@ class FieldRegistryTests(BaseFieldTests):
 
         self.assertEqual([top_level_bad_value, child_bad_value], errors)
 
+    def test_validate_converted_payload_with_aliased_keys(self):
+
+        def reject_bad(value, errors):
+            if value == 'bad':
+                errors.append('bad value')
+
+        registry = schema_fields.FieldRegistry('Test Registry')
+        sub_registry = registry.add_sub_registry('homepage', 'Homepage')
+        sub_registry.add_property(schema_fields.SchemaField(
+            'course:title', 'Title', 'string', validator=reject_bad))
+
+        # Settings editors may send fields at the top level rather than
+        # under their sub-registry, and nested under keys the schema does
+        # not name.  Whichever value is converted last must be validated.
+        for payload in (
+                {'homepage': {'course:title': 'ok'}, 'course:title': 'bad'},
+                {'homepage': {'course:title': 'ok'},
+                 'extra': {'course:title': 'bad'}}):
+            entity = {}
+            errors = []
+            registry.convert_json_to_entity(payload, entity)
+            registry.validate(entity, errors)
+            title = entity['course']['title']
+            self.assertEqual(['bad value'] if title == 'bad' else [], errors)
+
 
 class StructureRecursionTests(unittest.TestCase):
 
@@ -500,6 +525,47 @@ class DisplayTypeTests(unittest.TestCase):
             set(['array', 'string', 'datetime', 'group']))
 
 
+class CachedSchemaTests(StructureRecursionTests):
+
+    def test_serializations_are_reused(self):
+        self.assertIs(
+            self.schema.get_json_schema(), self.schema.get_json_schema())
+        self.assertEquals(
+            self.schema._get_schema_dict([]), self.schema.get_schema_dict())
+
+    def test_adding_property_to_child_invalidates_parent(self):
+        json_schema = self.schema.get_json_schema()
+        schema_dict = self.schema.get_schema_dict()
+        self.schema.get_sub_registry('child_dict_name').add_property(
+            schema_fields.SchemaField('new_child_prop', 'X', 'type7'))
+        self.assertNotEquals(json_schema, self.schema.get_json_schema())
+        self.assertIn('new_child_prop', self.schema.get_json_schema())
+        self.assertNotEquals(schema_dict, self.schema.get_schema_dict())
+
+    def test_changing_array_item_type_invalidates_parent(self):
+        self.assertNotIn('new_item_prop', self.schema.get_json_schema())
+        array = self.schema.get_property('complex_array_prop_name')
+        array.item_type.add_property(
+            schema_fields.SchemaField('new_item_prop', 'X', 'type7'))
+        self.assertIn('new_item_prop', self.schema.get_json_schema())
+
+    def test_removing_property_invalidates(self):
+        self.assertIn('parent_prop', self.schema.get_json_schema())
+        self.schema.remove_property('parent_prop')
+        self.assertNotIn('parent_prop', self.schema.get_json_schema())
+
+    def test_clone_does_not_reuse_serialization(self):
+        self.assertIn('parent_prop', self.schema.get_json_schema())
+        ret = self.schema.clone_only_items_named(['child_dict_name'])
+        self.assertNotIn('parent_prop', ret.get_json_schema())
+        self.assertIn('parent_prop', self.schema.get_json_schema())
+
+    def test_clone_of_child_does_not_copy_parent(self):
+        child = self.schema.get_sub_registry('child_dict_name')
+        ret = child.clone_only_items_named(['child_prop'])
+        self.assertIsNone(ret._parent)
+
+
 class CloneItemsNamedTests(StructureRecursionTests):
 
     def test_clone_no_paths(self):
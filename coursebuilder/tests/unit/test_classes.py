@@ -84,6 +84,22 @@ class DeepDictionaryMergeTest(suite.TestBase):
         e = {'a': {'b': 1}, 'c': {'d': 4}}
         self.assertEqual(e, r)
 
+    def test_shallow_overlay_matches_deep_merge(self):
+        tgt = {'a': {'b': 1, 'e': {}}, 'd': 4, 'f': {'g': 7}}
+        src = {'a': {'b': 2, 'e': {'h': 8}}, 'c': {'d': 4}, 'f': 6}
+        self.assertEqual(
+            courses.deep_dict_merge(tgt, src),
+            courses.shallow_overlay(tgt, src))
+
+    def test_shallow_overlay_shares_untouched_branches(self):
+        tgt = {'a': {'b': 1}}
+        src = {'a': {'c': 2}, 'd': {'e': 3}}
+        r = courses.shallow_overlay(tgt, src)
+        self.assertEqual({'a': {'b': 1, 'c': 2}, 'd': {'e': 3}}, r)
+        self.assertIs(src['d'], r['d'])
+        self.assertEqual({'a': {'b': 1}}, tgt)
+        self.assertEqual({'a': {'c': 2}, 'd': {'e': 3}}, src)
+
 
 class EtlRetryTest(suite.TestBase):
 